@@ -1,316 +1,638 @@
 import os
 import re
-import json
-import uuid
+import hmac
 import logging
-from flask import Flask, render_template, request, jsonify, send_from_directory
-from dotenv import load_dotenv
-from google import generativeai as genai
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+import hashlib
+import tempfile
+import time
+from flask import (
+    Flask, Response, render_template, request, jsonify, send_from_directory,
+    stream_with_context, url_for,
+)
+from flask.json.provider import JSONProvider
+from flask_compress import Compress
+import orjson
+from werkzeug.exceptions import HTTPException
+from werkzeug.security import safe_join
+from redis import Redis
+from rq import Queue
+from rq import get_current_job
+from rq.job import Job
+from rq.exceptions import NoSuchJobError
+
+from nutrifit import (
+    ANALYSIS_PROMPT,
+    MODEL_NAME,
+    call_model_with_audio,
+    create_pdf_from_json,
+    parse_report,
+    render_report_text,
+    report_filename,
+)
 
-# Load env
-load_dotenv()
-API_KEY = os.getenv("GOOGLE_API_KEY")
-if not API_KEY:
-    raise RuntimeError("Please set GOOGLE_API_KEY in your .env")
+class ORJSONProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson (used by jsonify and request.get_json).
+    """
 
-genai.configure(api_key=API_KEY)
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
-# Choose model (flash - cheaper / available)
-MODEL_NAME = "gemini-2.0-flash"
-model = genai.GenerativeModel(MODEL_NAME)
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
+app.json = ORJSONProvider(app)
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s %(levelname)s %(name)s: %(message)s"
 )
 app.logger.setLevel(logging.INFO)
 
-# Folder to store generated PDFs
+# Upload limits: audio beyond MAX_UPLOAD_MB is rejected with 413 before it is read.
+# Werkzeug spools file parts to disk; plain form fields stay small.
+app.config["MAX_CONTENT_LENGTH"] = int(os.getenv("MAX_UPLOAD_MB", "50")) * 1024 * 1024
+app.config["MAX_FORM_MEMORY_SIZE"] = 512 * 1024
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Audio types accepted for analysis (audio/webm is what the in-browser recorder produces)
+ALLOWED_AUDIO_MIME_TYPES = frozenset({
+    "audio/wav", "audio/x-wav", "audio/wave",
+    "audio/mpeg", "audio/mp3",
+    "audio/mp4", "audio/x-m4a", "audio/m4a", "audio/aac",
+    "audio/ogg", "audio/flac", "audio/x-flac",
+    "audio/webm",
+})
+# What browsers send for a Blob/File whose type they don't know
+UNDECLARED_MIME_TYPES = frozenset({"", "application/octet-stream"})
+# ISO-BMFF major brands of audio files; video MP4/MOV and HEIC images use others
+AUDIO_FTYP_BRANDS = frozenset({b"M4A ", b"M4B ", b"M4P ", b"F4A ", b"mp41", b"mp42", b"isom", b"iso2"})
+
+# Compress text responses. PDFs are already Flate-compressed and the SSE stream
+# must not be buffered, so neither is listed.
+app.config["COMPRESS_MIMETYPES"] = [
+    "application/json",
+    "text/html",
+    "text/css",
+    "application/javascript",
+    "text/javascript",
+]
+Compress(app)
+
+# Folder to store generated PDFs. Report filenames are derived from the report
+# content (see report_filename), so they never change once written.
 REPORTS_DIR = os.path.join(app.static_folder, "reports")
+REPORT_MAX_AGE = 365 * 24 * 3600
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
+# Let the front server stream report files instead of Python:
+# REPORTS_ACCEL_PREFIX (nginx, e.g. "/protected/reports/") emits X-Accel-Redirect,
+# USE_X_SENDFILE=1 (Apache mod_xsendfile / lighttpd) emits X-Sendfile.
+REPORTS_ACCEL_PREFIX = os.getenv("REPORTS_ACCEL_PREFIX")
+app.use_x_sendfile = os.getenv("USE_X_SENDFILE") == "1"
+
+# Uploaded audio is parked here until a worker picks the job up.
+# Web and worker processes must share this directory.
+UPLOADS_DIR = os.getenv("UPLOADS_DIR", os.path.join(tempfile.gettempdir(), "nutrifit_uploads"))
+os.makedirs(UPLOADS_DIR, exist_ok=True)
+
+# Background job queue (see worker.py)
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+QUEUE_NAME = "nutrifit"
+JOB_TIMEOUT = 600
+JOB_RESULT_TTL = 3600
+PROGRESS_POLL_INTERVAL = 0.5
+PROGRESS_HEARTBEAT_INTERVAL = 15
+redis_conn = Redis.from_url(REDIS_URL)
+queue = Queue(QUEUE_NAME, connection=redis_conn)
+
+# Resumable uploads: when set (e.g. "/files/"), the browser uploads through a
+# tusd server that writes into UPLOADS_DIR and calls /upload_complete when done.
+TUS_ENDPOINT = os.getenv("TUS_ENDPOINT")
+# Shared secret the hook request must carry in X-Hook-Secret; the hook is
+# disabled while unset. nginx sets the header on requests to tusd and tusd
+# forwards it (-hooks-http-forward-headers), see deploy/nginx.conf.
+TUS_HOOK_SECRET = os.getenv("TUS_HOOK_SECRET")
+# Resumable uploads exist for long recordings, so they get their own, larger cap
+# (keep tusd -max-size in line with it)
+MAX_TUS_UPLOAD_BYTES = int(os.getenv("MAX_TUS_UPLOAD_MB", "500")) * 1024 * 1024
+TUS_UPLOAD_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+# Raw model responses cached in Redis by audio content hash, so re-uploads of the
+# same recording skip Gemini. Shared by all worker processes.
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "600"))
+PROMPT_VERSION = hashlib.sha256(f"{MODEL_NAME}\n{ANALYSIS_PROMPT}".encode("utf-8")).hexdigest()[:12]
+
+
+def cached_call_model_with_audio(audio_path: str, mime_type: str, audio_sha256: str, prompt: str, on_delta=None) -> str:
+    """
+    call_model_with_audio behind the Redis response cache keyed by audio SHA-256 + prompt version.
+    """
+    key = f"nutrifit:raw:{PROMPT_VERSION}:{audio_sha256}"
+    cached = redis_conn.get(key)
+    if cached is not None:
+        hits = redis_conn.incr("nutrifit:cache:hits")
+        app.logger.info("Response cache hit sha256=%s hits=%s", audio_sha256[:12], hits)
+        return cached.decode("utf-8")
+
+    misses = redis_conn.incr("nutrifit:cache:misses")
+    app.logger.info("Response cache miss sha256=%s misses=%s", audio_sha256[:12], misses)
+    raw = call_model_with_audio(audio_path, mime_type, prompt, on_delta)
+    redis_conn.setex(key, RESPONSE_CACHE_TTL, raw)
+    return raw
 
-DUAL_PROMPT = r"""
-You are NutriFit AI — an advanced medical & nutrition intelligence assistant that analyzes dietician-client voice consultations.
 
-TASK:
-1) Transcribe the audio.
-2) Extract structured health & diet insights.
-3) Return two parts in this exact order:
+@app.route("/", methods=["GET"])
+def index():
+    return render_template("index.html", tus_endpoint=TUS_ENDPOINT)
 
-PART A — JSON ONLY (MANDATORY, parseable):
-Return a single JSON object with these keys exactly:
-{
-  "transcript": "full transcription string",
-  "summary": "short 4-6 line summary",
-  "key_health_concerns": [{"label":"string","evidence":"text excerpt","confidence":0.0}],
-  "dietary_habits": [{"label":"string","details":"text","confidence":0.0}],
-  "allergies_or_restrictions": [{"label":"string","evidence":"text","confidence":0.0}],
-  "suggested_improvements": ["action item 1","action item 2"],
-  "personalized_nutrition": {
-      "calorie_target": "e.g. 1800 kcal/day or null",
-      "macro_split": {"protein_pct":30,"carb_pct":45,"fat_pct":25},
-      "sample_meal_plan": ["Breakfast: ...","Lunch: ..."],
-      "hydration_l_per_day": 2.5,
-      "supplements": ["name - reason"]
-  },
-  "tone_emotion": {"primary":"Stressed","secondary":["Anxious"], "confidence":0.0},
-  "follow_up_questions": ["question 1","question 2"],
-  "metadata": {"duration_seconds": null, "speaker_segments": [], "confidence_overall":0.0}
-}
 
-Important rules:
-- JSON must be valid JSON only (no backticks, no explanation before it). If any field is unknown use null / [] / "".
-- Confidence fields are floats 0.0–1.0.
+def stream_key(job_id: str) -> str:
+    return f"nutrifit:stream:{job_id}"
 
-PART B — HUMAN-READABLE REPORT (after the JSON):
-Provide a concise professional report using the same headings. Keep it scannable.
 
-END.
-"""
+def rejected_upload_key(upload_id: str) -> str:
+    return f"nutrifit:rejected:{upload_id}"
 
 
-def call_model_with_audio(audio_bytes: bytes, mime_type: str, prompt: str) -> str:
+def publish_delta(text: str):
     """
-    Call Gemini generate_content with audio bytes and return raw text response.
+    Append a chunk of model output to the running job's stream buffer for /progress.
     """
-    app.logger.info(
-        "Calling Gemini model=%s mime_type=%s audio_bytes=%s",
-        MODEL_NAME,
-        mime_type,
-        len(audio_bytes),
-    )
-    response = model.generate_content(
-        [
-            prompt,
-            {"mime_type": mime_type, "data": audio_bytes}
-        ]
-    )
-    return response.text
-
-
-def extract_first_json(text: str):
-    """
-    Extract the first JSON object from model output robustly using recursion-capable regex.
-    Returns Python object or None.
-    """
-    # Try a regex using balanced-braces via recursion if supported
-    # Fallback simpler approach if regex engine doesn't support recursion
-    # We'll search for the first '{' and then attempt to parse progressively until valid JSON parsed.
-    start = text.find("{")
-    if start == -1:
-        return None, text
-
-    # Try to find a matching closing bracket by expanding
-    for end in range(start + 1, len(text)):
-        candidate = text[start:end + 1]
-        try:
-            parsed = json.loads(candidate)
-            # success
-            remainder = text[end + 1:].strip()
-            return parsed, remainder
-        except Exception:
-            continue
-
-    # As fallback, try to find a block using a looser regex (may fail on nested)
-    m = re.search(r'(\{(?:[^{}]|\{[^{}]*\})*\})', text, flags=re.DOTALL)
-    if m:
-        raw = m.group(1)
-        try:
-            return json.loads(raw), (text.replace(raw, "", 1).strip())
-        except Exception:
-            return None, text
-
-    return None, text
-
-
-def validate_json_schema(j: dict) -> bool:
-    """
-    Minimal validation: ensure essential keys exist.
-    """
-    required = ["transcript", "summary", "personalized_nutrition"]
-    return all(k in j for k in required)
-
-
-def create_pdf_from_json(j: dict, filename: str):
-    """
-    Create a readable PDF from structured JSON.
-    """
-    path = os.path.join(REPORTS_DIR, filename)
-    c = canvas.Canvas(path, pagesize=letter)
-    width, height = letter
-
-    margin_x = 40
-    y = height - 50
-    line_h = 14
-
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(margin_x, y, "NutriFit AI - Consultation Report")
-    y -= 28
-
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(margin_x, y, "Summary:")
-    y -= line_h
-    c.setFont("Helvetica", 11)
-    for ln in (j.get("summary") or "").splitlines():
-        if y < 60:
-            c.showPage()
-            y = height - 50
-        c.drawString(margin_x, y, ln)
-        y -= line_h
-
-    # Helper to draw a section
-    def draw_section(title, content_lines):
-        nonlocal y
-        if y < 80:
-            c.showPage()
-            y = height - 50
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(margin_x, y, title)
-        y -= line_h
-        c.setFont("Helvetica", 11)
-        for line in content_lines:
-            if y < 60:
-                c.showPage()
-                y = height - 50
-            c.drawString(margin_x + 6, y, "- " + line)
-            y -= line_h
-
-    # Key health concerns
-    kh = []
-    for item in j.get("key_health_concerns", []):
-        lab = item.get("label", "")
-        ev = item.get("evidence", "")
-        kh.append(f"{lab} — {ev} (conf: {item.get('confidence',0):.2f})")
-    if kh:
-        draw_section("Key Health Concerns", kh)
-
-    # Dietary habits
-    dh = []
-    for item in j.get("dietary_habits", []):
-        dh.append(f"{item.get('label','')}: {item.get('details','')} (conf: {item.get('confidence',0):.2f})")
-    if dh:
-        draw_section("Dietary Habits", dh)
-
-    # Suggestions
-    sug = j.get("suggested_improvements", [])
-    if sug:
-        draw_section("Suggested Improvements", sug)
-
-    # Personalized nutrition
-    pn = j.get("personalized_nutrition", {})
-    p_lines = []
-    p_lines.append(f"Calorie target: {pn.get('calorie_target') or 'N/A'}")
-    ms = pn.get("macro_split") or {}
-    p_lines.append(f"Macro split: P {ms.get('protein_pct','-')}% | C {ms.get('carb_pct','-')}% | F {ms.get('fat_pct','-')}%")
-    if pn.get("hydration_l_per_day"):
-        p_lines.append(f"Hydration: {pn.get('hydration_l_per_day')} L/day")
-    for meal in pn.get("sample_meal_plan", []):
-        p_lines.append(meal)
-    if pn.get("supplements"):
-        p_lines.append("Supplements: " + ", ".join(pn.get("supplements")))
-    draw_section("Personalized Nutrition", p_lines)
-
-    c.save()
-    return path
+    job = get_current_job()
+    if job is not None:
+        key = stream_key(job.id)
+        pipe = redis_conn.pipeline()
+        pipe.append(key, text)
+        pipe.expire(key, JOB_RESULT_TTL)
+        pipe.execute()
 
 
-@app.route("/", methods=["GET"])
-def index():
-    return render_template("index.html")
+def set_job_stage(stage: str):
+    """
+    Publish the current processing stage on the running job for /progress.
+    """
+    job = get_current_job()
+    if job is not None:
+        job.meta["stage"] = stage
+        job.save_meta()
 
 
-@app.route("/process", methods=["POST"])
-def process():
+def sniff_audio_mime(header: bytes):
     """
-    Receives an audio file (form-data key: audio), calls Gemini, returns parsed JSON + human report.
+    Identify the audio container from the first 12 bytes of a file.
+    Returns a mime type, or None if the bytes are not a known audio format.
     """
-    f = request.files.get("audio")
-    if not f:
-        app.logger.warning("Process request rejected: no audio file received")
-        return jsonify({"error": "No audio file received"}), 400
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return "audio/wav"
+    if header[4:8] == b"ftyp":
+        return "audio/mp4" if header[8:12] in AUDIO_FTYP_BRANDS else None
+    if header[:4] == b"OggS":
+        return "audio/ogg"
+    if header[:4] == b"fLaC":
+        return "audio/flac"
+    if header[:4] == b"\x1a\x45\xdf\xa3":
+        return "audio/webm"
+    if len(header) >= 2 and header[0] == 0xFF and header[1] & 0xF6 == 0xF0:
+        # ADTS frame sync (layer bits 00)
+        return "audio/aac"
+    if header[:3] == b"ID3" or (len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        # ID3 tag or MPEG / ADTS frame sync
+        return "audio/mpeg"
+    return None
+
+
+def check_audio_upload(mime_type: str, header: bytes):
+    """
+    Validate a declared mime type and the file's magic bytes before any Gemini call.
+    A missing or generic (application/octet-stream) type counts as undeclared.
+    Gemini always gets the sniffed type, since a declared type may not match the
+    bytes. Returns (mime type to use, None) or (None, error message).
+    """
+    if mime_type and mime_type not in UNDECLARED_MIME_TYPES and mime_type not in ALLOWED_AUDIO_MIME_TYPES:
+        return None, f"Unsupported audio type: {mime_type}"
+    sniffed = sniff_audio_mime(header)
+    if sniffed is None:
+        return None, "File content is not a recognized audio format"
+    return sniffed, None
 
-    app.logger.info(
-        "Received audio upload filename=%s content_type=%s content_length=%s",
-        f.filename,
-        f.content_type,
-        request.content_length,
-    )
-    audio_bytes = f.read()
-    mime_type = f.content_type or "audio/wav"
 
+def remove_upload(audio_path: str):
+    """
+    Delete an uploaded audio file, plus the <id>.info sidecar tusd's filestore
+    keeps next to resumable uploads.
+    """
+    os.remove(audio_path)
+    info_path = audio_path + ".info"
+    if os.path.exists(info_path):
+        os.remove(info_path)
+
+
+def run_gemini(audio_path: str, mime_type: str, audio_sha256: str = None, filename: str = None) -> dict:
+    """
+    Worker job: call Gemini on the uploaded audio, parse the JSON and build the PDF.
+    audio_sha256 is computed here when not given (tus uploads can be large, so
+    they are hashed on the worker rather than in the web request).
+    Returns the response payload for /status; failures are reported under "error".
+    """
     # Call model
+    set_job_stage("analyzing")
     try:
-        raw = call_model_with_audio(audio_bytes, mime_type, DUAL_PROMPT)
+        if audio_sha256 is None:
+            audio_sha256 = file_sha256(audio_path)
+        raw = cached_call_model_with_audio(
+            audio_path, mime_type, audio_sha256, ANALYSIS_PROMPT, on_delta=publish_delta,
+        )
     except Exception as e:
         app.logger.exception(
             "Gemini model call failed for filename=%s mime_type=%s",
-            f.filename,
+            filename,
             mime_type,
         )
-        return jsonify({
+        return {
             "error": "Model call failed",
             "details": str(e),
             "exception_type": e.__class__.__name__,
-        }), 500
+        }
+    finally:
+        remove_upload(audio_path)
 
-    # Extract JSON
-    parsed_json, remainder = extract_first_json(raw)
-    if parsed_json is None:
+    # Parse JSON (structured output, so the whole body is the object)
+    try:
+        parsed_json = parse_report(raw)
+    except ValueError:
         # Return raw for debugging
         app.logger.error(
-            "Could not extract JSON from model output for filename=%s raw_preview=%r",
-            f.filename,
+            "Could not parse JSON from model output for filename=%s raw_preview=%r",
+            filename,
             raw[:1000],
         )
-        return jsonify({"error": "Could not extract JSON from model output", "raw": raw}), 500
+        return {"error": "Could not parse JSON from model output", "raw": raw}
 
-    # Minimal validation
-    if not validate_json_schema(parsed_json):
-        # still continue but flagged
+    # Minimal validation: still continue but flagged
+    if "_validation_warning" in parsed_json:
         app.logger.warning(
-            "Parsed JSON missing required keys for filename=%s keys=%s",
-            f.filename,
+            "Parsed JSON failed schema validation for filename=%s keys=%s",
+            filename,
             sorted(parsed_json.keys()),
         )
-        parsed_json["_validation_warning"] = "Missing required top-level keys"
 
     # Create PDF and return URL
-    pdf_filename = f"NutriFit_Report_{uuid.uuid4().hex[:8]}.pdf"
+    set_job_stage("rendering_pdf")
+    pdf_filename = report_filename(parsed_json)
     try:
-        pdf_path = create_pdf_from_json(parsed_json, pdf_filename)
-        pdf_url = f"/static/reports/{pdf_filename}"
+        create_pdf_from_json(parsed_json, os.path.join(REPORTS_DIR, pdf_filename))
+        pdf_url = f"/download_report/{pdf_filename}"
     except Exception as e:
         app.logger.exception(
             "PDF generation failed for filename=%s pdf_filename=%s",
-            f.filename,
+            filename,
             pdf_filename,
         )
         pdf_url = None
 
+    try:
+        report_text = render_report_text(parsed_json)
+    except Exception:
+        app.logger.exception("Report text rendering failed for filename=%s", filename)
+        report_text = None
+
     app.logger.info(
-        "Process request completed filename=%s pdf_created=%s",
-        f.filename,
+        "Job completed filename=%s pdf_created=%s",
+        filename,
         bool(pdf_url),
     )
-    return jsonify({
+    return {
         "json": parsed_json,
-        "report_text": remainder.strip() or raw,
+        "report_text": report_text,
         "pdf_url": pdf_url
-    })
+    }
+
+
+@app.route("/process", methods=["POST"])
+def process():
+    """
+    Receives an audio file (form-data key: audio) and queues it for analysis.
+    Returns 202 with a job id; follow /progress/<job_id> (SSE) or poll /status/<job_id>
+    for the parsed JSON + human report. Oversized (413) or non-audio (415) uploads
+    are rejected before anything is written or queued.
+    """
+    # Reject on the declared length before the body is parsed
+    max_bytes = app.config["MAX_CONTENT_LENGTH"]
+    if request.content_length is not None and request.content_length > max_bytes:
+        return handle_upload_too_large(None)
+
+    f = request.files.get("audio")
+    if not f:
+        app.logger.warning("Process request rejected: no audio file received")
+        return jsonify({"error": "No audio file received"}), 400
+
+    app.logger.info(
+        "Received audio upload filename=%s content_type=%s content_length=%s",
+        f.filename,
+        f.content_type,
+        request.content_length,
+    )
+    # Peek at the magic bytes; the spooled upload is seekable
+    header = f.stream.read(12)
+    f.stream.seek(0)
+    mime_type, error = check_audio_upload(f.mimetype, header)
+    if error:
+        app.logger.warning("Process request rejected: filename=%s %s", f.filename, error)
+        return jsonify({"error": error}), 415
+
+    # Stream the audio to disk in chunks so only its path travels through Redis,
+    # hashing as we go for the response cache
+    ext = os.path.splitext(f.filename or "")[1]
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=UPLOADS_DIR, suffix=ext, delete=False) as tmp:
+        for chunk in iter(lambda: f.stream.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            tmp.write(chunk)
+    audio_path = tmp.name
+
+    job = enqueue_analysis(audio_path, mime_type, digest.hexdigest(), f.filename)
+
+    status_url = url_for("job_status", job_id=job.id)
+    return jsonify({
+        "job_id": job.id,
+        "status_url": status_url,
+        "progress_url": url_for("job_progress", job_id=job.id),
+    }), 202, {"Location": status_url}
+
+
+def enqueue_analysis(audio_path: str, mime_type: str, audio_sha256: str, filename: str, job_id: str = None) -> Job:
+    """
+    Queue run_gemini for an audio file already on disk in UPLOADS_DIR.
+    Pass audio_sha256=None to have the worker hash the file.
+    The file is removed if it cannot be queued.
+    """
+    try:
+        # By dotted path: under `python app.py` this module is __main__,
+        # which workers cannot import
+        job = queue.enqueue(
+            "app.run_gemini",
+            audio_path,
+            mime_type,
+            audio_sha256,
+            filename,
+            job_id=job_id,
+            job_timeout=JOB_TIMEOUT,
+            result_ttl=JOB_RESULT_TTL,
+        )
+    except Exception:
+        remove_upload(audio_path)
+        raise
+    app.logger.info("Queued job_id=%s filename=%s", job.id, filename)
+    return job
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tus_pre_create(upload: dict, tusd_v2: bool):
+    """
+    Refuse oversized or non-audio tus uploads before any bytes are sent.
+    tusd v2 reads RejectUpload from the body; v1 rejects on a non-2xx status.
+    """
+    size = upload.get("Size") or 0
+    filetype = (upload.get("MetaData") or {}).get("filetype") or ""
+    if upload.get("IsPartial"):
+        # Parallel-upload fragment: the final concatenated upload gets checked
+        return jsonify({}), 200
+    if size > MAX_TUS_UPLOAD_BYTES:
+        status, message = 413, "Audio file too large"
+    elif filetype not in UNDECLARED_MIME_TYPES and filetype not in ALLOWED_AUDIO_MIME_TYPES:
+        status, message = 415, f"Unsupported audio type: {filetype}"
+    else:
+        return jsonify({}), 200
+
+    app.logger.warning("tus upload refused at pre-create: size=%s filetype=%s", size, filetype)
+    if tusd_v2:
+        return jsonify({
+            "RejectUpload": True,
+            "HTTPResponse": {"StatusCode": status, "Body": message},
+        }), 200
+    return jsonify({"error": message}), status
+
+
+@app.route("/upload_complete", methods=["POST"])
+def upload_complete():
+    """
+    tusd HTTP hook (-hooks-http, pre-create and post-finish events). pre-create
+    refuses oversized / non-audio uploads; post-finish checks the file's magic
+    bytes and queues it under the tus upload id, so the client can follow
+    /progress/<upload id>.
+    Only tusd should reach this endpoint: requests must carry TUS_HOOK_SECRET.
+    """
+    secret = request.headers.get("X-Hook-Secret", "")
+    if not TUS_HOOK_SECRET or not hmac.compare_digest(secret, TUS_HOOK_SECRET):
+        app.logger.warning("tus hook rejected: missing or bad X-Hook-Secret")
+        return jsonify({"error": "Forbidden"}), 403
+
+    payload = request.get_json(silent=True) or {}
+    # tusd v2 wraps the event as {"Type", "Event": {"Upload"}}; v1 sends {"Upload"}
+    # with the hook name in a header.
+    hook_name = payload.get("Type") or request.headers.get("Hook-Name")
+    upload = (payload.get("Event") or payload).get("Upload") or {}
+    if hook_name == "pre-create":
+        return tus_pre_create(upload, tusd_v2="Type" in payload)
+    if hook_name != "post-finish" or upload.get("IsPartial"):
+        # Partial uploads of a parallel upload stay for tusd to concatenate;
+        # only the final upload is analyzed
+        return jsonify({}), 200
+
+    upload_id = upload.get("ID") or ""
+    audio_path = (upload.get("Storage") or {}).get("Path")
+    metadata = upload.get("MetaData") or {}
+    if not TUS_UPLOAD_ID_RE.match(upload_id) or not audio_path:
+        app.logger.warning("tus hook rejected: upload_id=%r path=%r", upload_id, audio_path)
+        return jsonify({"error": "Invalid tus upload"}), 400
+    if Job.exists(upload_id, connection=redis_conn):
+        app.logger.warning("tus hook rejected: job already exists upload_id=%s", upload_id)
+        return jsonify({"error": "Upload already queued"}), 409
+
+    # Only files tusd wrote into our uploads directory
+    audio_path = os.path.realpath(audio_path)
+    if os.path.dirname(audio_path) != os.path.realpath(UPLOADS_DIR) or not os.path.isfile(audio_path):
+        app.logger.warning("tus hook rejected: path outside UPLOADS_DIR path=%s", audio_path)
+        return jsonify({"error": "Invalid tus upload"}), 400
+
+    filename = metadata.get("filename")
+    with open(audio_path, "rb") as fh:
+        header = fh.read(12)
+    mime_type, error = check_audio_upload(metadata.get("filetype"), header)
+    if error:
+        app.logger.warning("tus upload rejected: upload_id=%s %s", upload_id, error)
+        remove_upload(audio_path)
+        # No job will exist under this id; keep the reason for /status and /progress
+        redis_conn.setex(rejected_upload_key(upload_id), JOB_RESULT_TTL, error)
+        return jsonify({}), 200
+
+    app.logger.info(
+        "Received tus upload upload_id=%s filename=%s content_type=%s size=%s",
+        upload_id,
+        filename,
+        mime_type,
+        upload.get("Size"),
+    )
+    # Hashed on the worker: reading a large upload here would block the gevent loop
+    enqueue_analysis(audio_path, mime_type, None, filename, job_id=upload_id)
+    return jsonify({}), 200
+
+
+def unknown_job_response(job_id: str):
+    """
+    404 for an unknown job id, or 415 with the reason if it names a tus upload
+    the post-finish hook rejected.
+    """
+    rejected = redis_conn.get(rejected_upload_key(job_id))
+    if rejected is not None:
+        return jsonify({"error": rejected.decode("utf-8")}), 415
+    return jsonify({"error": "Unknown job id"}), 404
+
+
+def failed_job_payload(job: Job) -> dict:
+    """
+    Log a crashed job's traceback and return a short error for the client
+    (exception type + message only, like the other error payloads).
+    """
+    result = job.latest_result()
+    exc_info = (result.exc_string if result else None) or ""
+    app.logger.error("Job failed job_id=%s\n%s", job.id, exc_info)
+    last_line = exc_info.strip().splitlines()[-1] if exc_info.strip() else ""
+    exception_type, _, details = last_line.partition(": ")
+    return {
+        "error": "Processing failed",
+        "details": details,
+        "exception_type": exception_type.rsplit(".", 1)[-1],
+    }
+
+
+@app.route("/status/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """
+    Poll a queued analysis. 202 while pending, then the job payload (500 if it failed,
+    415 if it was a tus upload rejected as non-audio).
+    """
+    try:
+        job = Job.fetch(job_id, connection=redis_conn)
+    except NoSuchJobError:
+        return unknown_job_response(job_id)
+
+    if job.is_failed:
+        return jsonify(failed_job_payload(job)), 500
+
+    if not job.is_finished:
+        return jsonify({"job_id": job_id, "status": job.get_status()}), 202
+
+    result = job.return_value()
+    if result.get("error"):
+        return jsonify(result), 500
+    return jsonify(result)
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(data).decode('utf-8')}\n\n"
+
+
+@app.route("/progress/<job_id>", methods=["GET"])
+def job_progress(job_id):
+    """
+    Server-sent events for a queued analysis: "progress" on every stage change,
+    "delta" for each chunk of model output as Gemini streams it, then a terminal
+    "done" event carrying the same payload as /status. A comment heartbeat is sent
+    after PROGRESS_HEARTBEAT_INTERVAL seconds of silence to keep proxies from
+    closing the stream.
+    """
+    try:
+        job = Job.fetch(job_id, connection=redis_conn)
+    except NoSuchJobError:
+        return unknown_job_response(job_id)
+
+    def generate():
+        last_stage = None
+        sent = 0
+        last_write = time.monotonic()
+        while True:
+            job.refresh()
+            # Forward model output produced since the last tick
+            chunk = redis_conn.getrange(stream_key(job_id), sent, -1)
+            if chunk:
+                sent += len(chunk)
+                last_write = time.monotonic()
+                yield sse_event("delta", {"delta": chunk.decode("utf-8")})
+            if job.is_failed:
+                yield sse_event("done", failed_job_payload(job))
+                return
+            if job.is_finished:
+                yield sse_event("done", job.return_value())
+                return
+
+            stage = job.meta.get("stage") or job.get_status()
+            if stage != last_stage:
+                last_stage = stage
+                last_write = time.monotonic()
+                yield sse_event("progress", {"job_id": job_id, "stage": stage})
+            elif time.monotonic() - last_write >= PROGRESS_HEARTBEAT_INTERVAL:
+                last_write = time.monotonic()
+                yield ": heartbeat\n\n"
+            time.sleep(PROGRESS_POLL_INTERVAL)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.route("/download_report/<filename>", methods=["GET"])
 def download_report(filename):
-    # Serve from static/reports
-    return send_from_directory(REPORTS_DIR, filename, as_attachment=True)
+    # Serve from static/reports; content-addressed filenames make the response
+    # immutable, and conditional requests get a 304 from the ETag / Last-Modified
+    path = safe_join(REPORTS_DIR, filename)
+    if path is None or not os.path.isfile(path):
+        return jsonify({"error": "Report not found"}), 404
+    if REPORTS_ACCEL_PREFIX:
+        # nginx serves the body from an internal location via sendfile(2)
+        response = app.response_class(mimetype="application/pdf")
+        response.headers["X-Accel-Redirect"] = REPORTS_ACCEL_PREFIX.rstrip("/") + "/" + filename
+        response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        response.cache_control.max_age = REPORT_MAX_AGE
+    else:
+        response = send_from_directory(
+            REPORTS_DIR,
+            filename,
+            as_attachment=True,
+            conditional=True,
+            max_age=REPORT_MAX_AGE,
+        )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@app.errorhandler(413)
+def handle_upload_too_large(error):
+    app.logger.warning("Upload rejected: content_length=%s exceeds limit", request.content_length)
+    return jsonify({
+        "error": "Audio file too large",
+        "max_bytes": app.config["MAX_CONTENT_LENGTH"],
+    }), 413
 
 
 @app.errorhandler(Exception)
 def handle_unexpected_error(error):
+    # 404s, 405s etc. keep their own status
+    if isinstance(error, HTTPException):
+        return error
     app.logger.exception("Unhandled server error during %s %s", request.method, request.path)
     return jsonify({
         "error": "Internal server error",
@@ -320,4 +642,5 @@ def handle_unexpected_error(error):
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    # Development server only; production runs gunicorn (see wsgi.py)
+    app.run(debug=os.getenv("FLASK_DEBUG") == "1")
@@ -0,0 +1,12 @@
+# Gunicorn settings for the NutriFit web app (see wsgi.py).
+# The web process only waits on I/O (uploads, Redis, SSE streams), so gevent
+# lets each worker hold many concurrent connections.
+import os
+
+# Loopback by default: the app sits behind nginx (deploy/nginx.conf)
+bind = os.getenv("BIND", "127.0.0.1:8000")
+worker_class = "gevent"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_connections = 1000
+# Leave room for long uploads and SSE streams of slow Gemini completions
+timeout = 120
@@ -1,104 +1,30 @@
-import streamlit as st
-import google.generativeai as genai
 import os
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+import tempfile
 from io import BytesIO
 
-# Configure Gemini Key
-from dotenv import load_dotenv
-import os
-import google.generativeai as genai
-
-# Load .env file
-load_dotenv()
-
-# Configure Gemini Key from environment variable
-api_key = os.getenv("GEMINI_API_KEY")
-
-if not api_key:
-    raise Exception("❌ API Key not found! Ensure .env file exists and variable name is correct.")
-
-genai.configure(api_key=api_key)
-
-
-# Prompt for analysis
-prompt = """
-You are NutriFit AI — an advanced medical and nutrition intelligence assistant trained 
-to understand diet-related conversations between a dietician and a client.
-
-You will receive a call recording. Your job is to:
-
-1. Transcribe the audio clearly.
-2. Analyze the conversation deeply and extract health-related insights.
-3. Structure the final output in the following format (no empty sections):
-
-**1. Conversation Transcript**
-(Write the transcript in readable format.)
-
-**2. Summary of Call**
-(4-6 lines summarizing the conversation.)
-
-**3. Key Health Concerns**
-(List medical and lifestyle concerns mentioned.)
-
-**4. Dietary Habits Observed**
-(Identify eating patterns, cuisines, frequency, and problems.)
-
-**5. Possible Allergies or Restrictions**
-(If none mentioned, infer based on discussion.)
-
-**6. Suggested Improvements**
-(Give actionable and specific suggestions based on the call.)
-
-**7. Personalized Nutrition Recommendation**
-(Macro focus, diet type, hydration level, supplements if applicable.)
-
-**8. Tone and Emotion Analysis**
-(e.g., Confused, Motivated, Stressed, Confident.)
-
-Make the output clinically useful, simple to read, and professional.
-Avoid disclaimers unless necessary.
-"""
-
-
-model = genai.GenerativeModel("gemini-2.5-flash")
-
+import streamlit as st
 
+from nutrifit import analyze, build_pdf, render_report_text
 
-def analyze_audio(file):
-    audio_bytes = uploaded_audio.read()
+# The Streamlit frontend keeps gemini-2.5-flash unless GEMINI_MODEL overrides it
+MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 
-    response = model.generate_content(
-    [
-        prompt,
-        {
-            "mime_type": uploaded_audio.type,  # streamlit auto-detects mime 
-            "data": audio_bytes
-        }
-    ]
-)
 
-    return response.text.strip()
+@st.cache_data(show_spinner=False)
+def analyze_audio(audio_bytes, mime_type, suffix):
+    # Cached by content: Streamlit reruns this script on every interaction
+    # (including the download click), so identical audio is analyzed once
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        tmp.write(audio_bytes)
+    try:
+        return analyze(tmp.name, mime_type, model_name=MODEL_NAME)
+    finally:
+        os.remove(tmp.name)
 
 
-def create_pdf(text_content):
+def create_pdf(report_json):
     buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-
-    width, height = letter
-    y = height - 50  # top margin
-    line_height = 14
-
-    for line in text_content.split("\n"):
-        if y < 50:
-            c.showPage()
-            y = height - 50
-
-        c.drawString(40, y, line)
-        y -= line_height
-
-    c.save()
+    build_pdf(report_json, buffer)
     buffer.seek(0)
     return buffer
 
@@ -111,10 +37,17 @@ uploaded_audio = st.file_uploader("Upload Call Recording", type=['mp3', 'wav', '
 
 if uploaded_audio:
     with st.spinner("Analyzing audio... please wait ⏳"):
-        result = analyze_audio(uploaded_audio)
+        result = analyze_audio(
+            uploaded_audio.getvalue(),
+            uploaded_audio.type,  # streamlit auto-detects mime
+            os.path.splitext(uploaded_audio.name)[1],
+        )
 
     st.success("Analysis Complete ✔️")
-    st.write(result)
+    st.text(render_report_text(result))
+
+    with st.expander("Transcript"):
+        st.write(result.get("transcript") or "")
 
 
     # Create PDF
@@ -0,0 +1,22 @@
+"""
+NutriFit AI core: Gemini analysis of consultation audio and report rendering,
+shared by the Flask app (app.py) and the Streamlit frontend (main.py).
+"""
+from .core import analyze, parse_report, validate_json_schema
+from .model import MODEL_NAME, call_model_with_audio, get_model
+from .pdf import build_pdf, create_pdf_from_json, render_report_text, report_filename
+from .prompts import ANALYSIS_PROMPT
+
+__all__ = [
+    "ANALYSIS_PROMPT",
+    "MODEL_NAME",
+    "analyze",
+    "build_pdf",
+    "call_model_with_audio",
+    "create_pdf_from_json",
+    "get_model",
+    "parse_report",
+    "render_report_text",
+    "report_filename",
+    "validate_json_schema",
+]
@@ -0,0 +1,44 @@
+"""
+Shared analysis pipeline used by the Flask app and the Streamlit frontend.
+"""
+import fastjsonschema
+import orjson
+
+from .model import MODEL_NAME, call_model_with_audio
+from .prompts import ANALYSIS_PROMPT
+from .schema import REPORT_JSON_SCHEMA
+
+# Compiled once at import into a plain Python function
+_VALIDATE = fastjsonschema.compile(REPORT_JSON_SCHEMA)
+
+
+def validate_json_schema(j: dict) -> bool:
+    """
+    Validate a parsed report against REPORT_JSON_SCHEMA (essential keys + field types).
+    """
+    try:
+        _VALIDATE(j)
+        return True
+    except fastjsonschema.JsonSchemaException:
+        return False
+
+
+def parse_report(raw: str) -> dict:
+    """
+    Parse the model's structured-output JSON, flagging reports that fail validation.
+    Raises ValueError if the text is not valid JSON or not a JSON object.
+    """
+    parsed = orjson.loads(raw)
+    if not isinstance(parsed, dict):
+        raise ValueError(f"Expected a JSON object, got {type(parsed).__name__}")
+    if not validate_json_schema(parsed):
+        parsed["_validation_warning"] = "Report does not match the expected schema"
+    return parsed
+
+
+def analyze(audio_path: str, mime_type: str, on_delta=None, model_name: str = MODEL_NAME) -> dict:
+    """
+    Run the full analysis on an audio file with model_name and return the parsed report JSON.
+    """
+    raw = call_model_with_audio(audio_path, mime_type, ANALYSIS_PROMPT, on_delta, model_name)
+    return parse_report(raw)
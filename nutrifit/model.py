@@ -0,0 +1,78 @@
+"""
+Gemini client: configuration, the process-wide model and the audio call.
+"""
+import os
+import logging
+import threading
+
+from dotenv import load_dotenv
+from google import generativeai as genai
+
+from .schema import NutriReport
+
+logger = logging.getLogger(__name__)
+
+# Load env
+load_dotenv()
+API_KEY = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+if not API_KEY:
+    raise RuntimeError("Please set GOOGLE_API_KEY in your .env")
+
+genai.configure(api_key=API_KEY)
+
+# Choose model (flash - cheaper / available)
+MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+_models = {}
+_model_lock = threading.Lock()
+
+GENERATION_CONFIG = genai.GenerationConfig(
+    response_mime_type="application/json",
+    response_schema=NutriReport,
+)
+
+
+def get_model(model_name: str = MODEL_NAME):
+    """
+    Lazily create the process-wide GenerativeModel for model_name. The SDK builds
+    its client on the first generate_content and caches it for the process, so
+    later calls reuse it.
+    """
+    model = _models.get(model_name)
+    if model is None:
+        with _model_lock:
+            model = _models.get(model_name)
+            if model is None:
+                model = _models[model_name] = genai.GenerativeModel(model_name)
+    return model
+
+
+def call_model_with_audio(audio_path: str, mime_type: str, prompt: str, on_delta=None, model_name: str = MODEL_NAME) -> str:
+    """
+    Upload the audio file through the Gemini File API (streamed from disk),
+    stream generate_content and return the raw JSON text response.
+    on_delta, if given, is called with each text chunk as it arrives.
+    """
+    logger.info(
+        "Calling Gemini model=%s mime_type=%s audio_bytes=%s",
+        model_name,
+        mime_type,
+        os.path.getsize(audio_path),
+    )
+    uploaded = genai.upload_file(path=audio_path, mime_type=mime_type)
+    try:
+        response = get_model(model_name).generate_content(
+            [prompt, uploaded],
+            generation_config=GENERATION_CONFIG,
+            stream=True,
+        )
+        chunks = []
+        for chunk in response:
+            chunks.append(chunk.text)
+            if on_delta:
+                on_delta(chunk.text)
+        return "".join(chunks)
+    finally:
+        try:
+            genai.delete_file(uploaded.name)
+        except Exception:
+            logger.warning("Could not delete Gemini file %s", uploaded.name)
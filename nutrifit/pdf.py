@@ -0,0 +1,245 @@
+"""
+Report rendering: text sections, the human-readable report and the PDF.
+"""
+import os
+import json
+import uuid
+import hashlib
+import logging
+from functools import lru_cache
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the PDF layout or section text changes, so cached reports are re-rendered
+PDF_RENDERER_VERSION = "2"
+
+
+# Reports that failed validation are still rendered, so fields may be null or of
+# the wrong type: these keep only values of the expected shape.
+def _dict(value) -> dict:
+    return value if isinstance(value, dict) else {}
+
+
+def _text(value) -> str:
+    return value if isinstance(value, str) else ""
+
+
+def _strings(value) -> list:
+    return [s for s in value if isinstance(s, str)] if isinstance(value, list) else []
+
+
+def _items(value) -> list:
+    return [item for item in value if isinstance(item, dict)] if isinstance(value, list) else []
+
+
+def report_sections(j: dict) -> list:
+    """
+    Build the (title, lines) sections shared by the text report and the PDF.
+    """
+    sections = []
+
+    def conf(item):
+        c = item.get("confidence")
+        return f"(conf: {c if isinstance(c, (int, float)) else 0:.2f})"
+
+    # Key health concerns
+    kh = []
+    for item in _items(j.get("key_health_concerns")):
+        kh.append(f"{_text(item.get('label'))} — {_text(item.get('evidence'))} {conf(item)}")
+    if kh:
+        sections.append(("Key Health Concerns", kh))
+
+    # Dietary habits
+    dh = []
+    for item in _items(j.get("dietary_habits")):
+        dh.append(f"{_text(item.get('label'))}: {_text(item.get('details'))} {conf(item)}")
+    if dh:
+        sections.append(("Dietary Habits", dh))
+
+    # Allergies / restrictions
+    ar = []
+    for item in _items(j.get("allergies_or_restrictions")):
+        ar.append(f"{_text(item.get('label'))} — {_text(item.get('evidence'))} {conf(item)}")
+    if ar:
+        sections.append(("Allergies or Restrictions", ar))
+
+    # Suggestions
+    sug = _strings(j.get("suggested_improvements"))
+    if sug:
+        sections.append(("Suggested Improvements", sug))
+
+    # Personalized nutrition
+    pn = _dict(j.get("personalized_nutrition"))
+    p_lines = []
+    p_lines.append(f"Calorie target: {pn.get('calorie_target') or 'N/A'}")
+    ms = _dict(pn.get("macro_split"))
+    pct = {k: "-" if ms.get(k) is None else ms[k] for k in ("protein_pct", "carb_pct", "fat_pct")}
+    p_lines.append(f"Macro split: P {pct['protein_pct']}% | C {pct['carb_pct']}% | F {pct['fat_pct']}%")
+    if pn.get("hydration_l_per_day"):
+        p_lines.append(f"Hydration: {pn.get('hydration_l_per_day')} L/day")
+    p_lines.extend(_strings(pn.get("sample_meal_plan")))
+    supplements = _strings(pn.get("supplements"))
+    if supplements:
+        p_lines.append("Supplements: " + ", ".join(supplements))
+    sections.append(("Personalized Nutrition", p_lines))
+
+    # Tone / emotion
+    te = _dict(j.get("tone_emotion"))
+    primary = _text(te.get("primary"))
+    if primary:
+        secondary = ", ".join(_strings(te.get("secondary")))
+        sections.append(("Tone and Emotion", [primary + (f" ({secondary})" if secondary else "")]))
+
+    # Follow-up questions
+    fq = _strings(j.get("follow_up_questions"))
+    if fq:
+        sections.append(("Follow-up Questions", fq))
+
+    return sections
+
+
+def render_report_text(j: dict) -> str:
+    """
+    Render the human-readable report locally from the structured JSON.
+    """
+    parts = ["Summary:", _text(j.get("summary")).strip()]
+    for title, lines in report_sections(j):
+        parts.append("")
+        parts.append(title + ":")
+        parts.extend("- " + line for line in lines)
+    return "\n".join(parts)
+
+
+def report_filename(j: dict) -> str:
+    """
+    Content-addressed PDF name: identical reports rendered by the same
+    renderer version map to the same file.
+    """
+    canonical = json.dumps(j, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    digest = hashlib.sha256(f"{PDF_RENDERER_VERSION}\n{canonical}".encode("utf-8")).hexdigest()
+    return f"NutriFit_Report_{digest[:16]}.pdf"
+
+
+@lru_cache(maxsize=8192)
+def text_width(text: str, font_name: str, font_size: float) -> float:
+    """
+    Memoized stringWidth: reports repeat the same words, so most lookups hit the cache.
+    """
+    return stringWidth(text, font_name, font_size)
+
+
+def wrap_text(text: str, font_name: str, font_size: float, max_width: float) -> list:
+    """
+    Greedy word wrap to max_width points using cached word widths (the base-14
+    fonts have no kerning, so a line's width is the sum of its words and spaces).
+    Words wider than a whole line are broken by character.
+    """
+    space_w = text_width(" ", font_name, font_size)
+    lines, cur, cur_w = [], [], 0.0
+    for word in text.split():
+        w = text_width(word, font_name, font_size)
+        if cur and cur_w + space_w + w > max_width:
+            lines.append(" ".join(cur))
+            cur, cur_w = [], 0.0
+        if w > max_width:
+            piece, piece_w = "", 0.0
+            for ch in word:
+                ch_w = text_width(ch, font_name, font_size)
+                if piece and piece_w + ch_w > max_width:
+                    lines.append(piece)
+                    piece, piece_w = "", 0.0
+                piece += ch
+                piece_w += ch_w
+            word, w = piece, piece_w
+        cur_w += (space_w if cur else 0.0) + w
+        cur.append(word)
+    if cur:
+        lines.append(" ".join(cur))
+    return lines
+
+
+def build_pdf(j: dict, out):
+    """
+    Draw the report PDF into out (a path or a binary file object).
+    Text is wrapped to the page width and written through one text object per page.
+    """
+    c = canvas.Canvas(out, pagesize=letter)
+    width, height = letter
+
+    margin_x = 40
+    top = height - 50
+    bottom = 60
+    line_h = 14
+    bullet_indent = 6
+    max_w = width - 2 * margin_x
+
+    t = c.beginText(margin_x, top)
+    font = None
+    indent = 0
+
+    def set_font(name, size, leading=line_h):
+        nonlocal font
+        font = (name, size, leading)
+        t.setFont(name, size, leading)
+
+    def new_page():
+        nonlocal t
+        c.drawText(t)
+        c.showPage()
+        t = c.beginText(margin_x + indent, top)
+        t.setFont(*font)
+
+    def set_indent(dx):
+        nonlocal indent
+        t.moveCursor(dx - indent, 0)
+        indent = dx
+
+    def write(text, first_prefix="", rest_prefix=""):
+        name, size, _ = font
+        wrapped = wrap_text(text, name, size, max_w - indent - text_width(first_prefix, name, size)) or [""]
+        for i, ln in enumerate(wrapped):
+            if t.getY() < bottom:
+                new_page()
+            t.textLine((first_prefix if i == 0 else rest_prefix) + ln)
+
+    set_font("Helvetica-Bold", 16, 28)
+    write("NutriFit AI - Consultation Report")
+
+    set_font("Helvetica-Bold", 12)
+    write("Summary:")
+    set_font("Helvetica", 11)
+    for ln in _text(j.get("summary")).splitlines():
+        write(ln)
+
+    for title, lines in report_sections(j):
+        if t.getY() < 80:
+            new_page()
+        set_font("Helvetica-Bold", 12)
+        write(title)
+        set_font("Helvetica", 11)
+        set_indent(bullet_indent)
+        for line in lines:
+            write(line, "- ", "  ")
+        set_indent(0)
+
+    c.drawText(t)
+    c.save()
+
+
+def create_pdf_from_json(j: dict, path: str):
+    """
+    Write the report PDF to path, unless it was already rendered.
+    """
+    if os.path.exists(path):
+        logger.info("PDF cache hit pdf_filename=%s", os.path.basename(path))
+        return path
+
+    # Render to a temp name and move into place so readers never see a partial file
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    build_pdf(j, tmp_path)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,109 @@
+"""
+Response schema for Gemini structured output (mirrors prompts.ANALYSIS_PROMPT).
+"""
+from typing_extensions import TypedDict
+
+
+class Finding(TypedDict):
+    label: str
+    evidence: str
+    confidence: float
+
+
+class DietaryHabit(TypedDict):
+    label: str
+    details: str
+    confidence: float
+
+
+class MacroSplit(TypedDict):
+    protein_pct: int
+    carb_pct: int
+    fat_pct: int
+
+
+class PersonalizedNutrition(TypedDict):
+    calorie_target: str
+    macro_split: MacroSplit
+    sample_meal_plan: list[str]
+    hydration_l_per_day: float
+    supplements: list[str]
+
+
+class ToneEmotion(TypedDict):
+    primary: str
+    secondary: list[str]
+    confidence: float
+
+
+class ReportMetadata(TypedDict):
+    duration_seconds: float
+    speaker_segments: list[str]
+    confidence_overall: float
+
+
+class NutriReport(TypedDict):
+    transcript: str
+    summary: str
+    key_health_concerns: list[Finding]
+    dietary_habits: list[DietaryHabit]
+    allergies_or_restrictions: list[Finding]
+    suggested_improvements: list[str]
+    personalized_nutrition: PersonalizedNutrition
+    tone_emotion: ToneEmotion
+    follow_up_questions: list[str]
+    metadata: ReportMetadata
+
+
+# The same shape as JSON Schema, for validating parsed reports (see core.validate_json_schema).
+# Only the essential keys are required; nulls are tolerated where the model may omit a value.
+_FINDING = {
+    "type": "object",
+    "properties": {
+        "label": {"type": ["string", "null"]},
+        "evidence": {"type": ["string", "null"]},
+        "details": {"type": ["string", "null"]},
+        "confidence": {"type": ["number", "null"]},
+    },
+}
+_STRINGS = {"type": "array", "items": {"type": "string"}}
+
+REPORT_JSON_SCHEMA = {
+    "type": "object",
+    "required": ["transcript", "summary", "personalized_nutrition"],
+    "properties": {
+        "transcript": {"type": "string"},
+        "summary": {"type": "string"},
+        "key_health_concerns": {"type": "array", "items": _FINDING},
+        "dietary_habits": {"type": "array", "items": _FINDING},
+        "allergies_or_restrictions": {"type": "array", "items": _FINDING},
+        "suggested_improvements": _STRINGS,
+        "personalized_nutrition": {
+            "type": "object",
+            "properties": {
+                "calorie_target": {"type": ["string", "number", "null"]},
+                "macro_split": {
+                    "type": ["object", "null"],
+                    "properties": {
+                        "protein_pct": {"type": ["number", "null"]},
+                        "carb_pct": {"type": ["number", "null"]},
+                        "fat_pct": {"type": ["number", "null"]},
+                    },
+                },
+                "sample_meal_plan": _STRINGS,
+                "hydration_l_per_day": {"type": ["number", "null"]},
+                "supplements": _STRINGS,
+            },
+        },
+        "tone_emotion": {
+            "type": "object",
+            "properties": {
+                "primary": {"type": ["string", "null"]},
+                "secondary": _STRINGS,
+                "confidence": {"type": ["number", "null"]},
+            },
+        },
+        "follow_up_questions": _STRINGS,
+        "metadata": {"type": "object"},
+    },
+}
@@ -5,6 +5,7 @@ const recordBtn = document.getElementById("recordBtn");
 const stopBtn = document.getElementById("stopBtn");
 const chatBox = document.getElementById("chatBox");
 const loadingEl = document.getElementById("loading");
+const loadingText = document.getElementById("loadingText");
 const progressBar = document.getElementById("progressBar");
 const player = document.getElementById("player");
 const actions = document.getElementById("actions");
@@ -31,12 +32,14 @@ function appendMessage(text, sender="bot") {
     el.innerText = text;
     chatBox.appendChild(el);
     chatBox.scrollTop = chatBox.scrollHeight;
+    return el;
 }
 
 // Progress animation simulator
 let progressInterval;
 function startProgress() {
     loadingEl.classList.remove("hidden");
+    loadingText.innerText = STAGE_LABELS.queued;
     progressBar.style.width = "0%";
     let w = 0;
     progressInterval = setInterval(()=>{
@@ -53,16 +56,94 @@ function stopProgress() {
     }, 600);
 }
 
+// Follow a queued job over SSE until the worker has finished it
+const STAGE_LABELS = {
+    queued: "⏳ Waiting for a worker...",
+    started: "⏳ Processing audio...",
+    analyzing: "⏳ Analyzing audio with Gemini...",
+    rendering_pdf: "⏳ Building PDF report...",
+};
+function waitForJob(progressUrl, onDelta) {
+    return new Promise((resolve, reject) => {
+        const es = new EventSource(progressUrl);
+        es.addEventListener("delta", e => onDelta(JSON.parse(e.data).delta));
+        es.addEventListener("progress", e => {
+            const { stage } = JSON.parse(e.data);
+            loadingText.innerText = STAGE_LABELS[stage] || STAGE_LABELS.started;
+        });
+        es.addEventListener("done", e => {
+            es.close();
+            resolve(JSON.parse(e.data));
+        });
+        es.onerror = () => {
+            es.close();
+            reject(new Error("Lost connection to progress stream"));
+        };
+    });
+}
+
+// Resumable upload through tusd (when configured). The job id is the tus
+// upload id; tusd queues it via its post-finish hook, so wait for it to appear
+// (or for the hook's rejection, reported as 415).
+const TUS_CHUNK_SIZE = 8 * 1024 * 1024;
+const TUS_PARALLEL_UPLOADS = 4;
+function tusUpload(blob, filename) {
+    return new Promise((resolve, reject) => {
+        const upload = new tus.Upload(blob, {
+            endpoint: window.TUS_ENDPOINT,
+            chunkSize: TUS_CHUNK_SIZE,
+            parallelUploads: TUS_PARALLEL_UPLOADS,
+            retryDelays: [0, 1000, 3000, 5000],
+            metadata: { filename: filename, filetype: blob.type || "" },
+            onError: reject,
+            onSuccess: () => resolve(upload.url.split("/").pop()),
+        });
+        upload.start();
+    });
+}
+async function waitForQueuedJob(jobId) {
+    const statusUrl = `/status/${jobId}`;
+    for (let i = 0; i < 20; i++) {
+        const res = await fetch(statusUrl);
+        if (res.status === 415) {
+            return { status: res.status, data: await res.json() };
+        }
+        if (res.status !== 404) {
+            return { status: 202, data: { job_id: jobId, status_url: statusUrl, progress_url: `/progress/${jobId}` } };
+        }
+        await new Promise(r => setTimeout(r, 500));
+    }
+    throw new Error("Upload finished but no analysis job was queued");
+}
+
+async function submitAudio(blob, filename) {
+    if (window.TUS_ENDPOINT && window.tus && tus.isSupported) {
+        return waitForQueuedJob(await tusUpload(blob, filename));
+    }
+    const fd = new FormData();
+    fd.append("audio", blob, filename);
+    const res = await fetch("/process", { method: "POST", body: fd });
+    return { status: res.status, data: await res.json() };
+}
+
 // Send file to backend
 async function sendAudioBlob(blob, filename="recording.wav") {
     appendMessage("Uploading audio...", "user");
     startProgress();
-    const fd = new FormData();
-    fd.append("audio", blob, filename);
     try {
-        const res = await fetch("/process", { method: "POST", body: fd });
-        const data = await res.json();
+        const res = await submitAudio(blob, filename);
+        let data = res.data;
+        // Live model output, replaced by the rendered report once the job is done
+        let liveEl = null;
+        if (res.status === 202) {
+            data = await waitForJob(data.progress_url, delta => {
+                if (!liveEl) liveEl = appendMessage("", "bot");
+                liveEl.innerText += delta;
+                chatBox.scrollTop = chatBox.scrollHeight;
+            });
+        }
         stopProgress();
+        if (liveEl) liveEl.remove();
 
         if (data.error) {
             const detail = data.details ? ` (${data.exception_type || "Error"}: ${data.details})` : "";
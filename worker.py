@@ -0,0 +1,31 @@
+"""
+RQ workers for NutriFit analysis jobs.
+
+Run alongside the web app (same REDIS_URL / UPLOADS_DIR):
+    python worker.py
+which starts a fixed pool of WORKER_COUNT workers (default 4) on the
+"nutrifit" queue, so at most that many Gemini calls run at once no matter
+how many uploads arrive.
+
+Each worker is a SimpleWorker: jobs run in the worker process instead of a
+fork per job, so the Gemini client the SDK creates on a worker's first job is
+reused by its later jobs.
+"""
+import os
+
+from rq import SimpleWorker
+from rq.worker_pool import WorkerPool
+
+from app import app, queue, redis_conn
+
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", "4"))
+
+
+if __name__ == "__main__":
+    app.logger.info("Starting %s workers queue=%s", WORKER_COUNT, queue.name)
+    WorkerPool(
+        [queue],
+        connection=redis_conn,
+        num_workers=WORKER_COUNT,
+        worker_class=SimpleWorker,
+    ).start()
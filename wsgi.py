@@ -0,0 +1,10 @@
+"""
+Production entrypoint:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+# Patch the stdlib before anything else imports sockets/threads
+from gevent import monkey
+
+monkey.patch_all()
+
+from app import app  # noqa: E402